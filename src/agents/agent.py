@@ -1,25 +1,140 @@
+from functools import lru_cache
 from typing import Dict, List, Optional
 
+import aiosqlite
+import httpx
+import orjson
+from langchain_core.caches import InMemoryCache
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import StateGraph
-from pydantic import BaseModel, Field
+from langgraph.graph.state import CompiledStateGraph
+from pydantic import BaseModel, TypeAdapter
 
 from src.agents.models.states import (
-    ATSAnalysis,
     CompanyContext,
-    FinalReview,
     Gap,
+    JobAnalysis,
     MatchedSkill,
+    MatchStatus,
+    PolishResult,
     PrioritizedImprovement,
+    PrioritizedImprovements,
+    RequestAnalysis,
     RequestType,
     Requirement,
+    RequirementMatches,
+    StructuredResume,
+    SuggestionDraft,
     TailoringSuggestion,
 )
+from src.agents.prompts import (
+    ANALYZE_RESUME_PROMPT,
+    DIRECT_EDIT_PROMPT,
+    INTENT_PROMPT,
+    JOB_ANALYSIS_PROMPT,
+    POLISH_PROMPT,
+    PRIORITIZE_PROMPT,
+    SUGGESTION_PROMPT,
+)
 from src.config.settings import settings
+from src.utils.ats import ats_score, skill_coverage
 from src.utils.logger_config import setup_logger
+from src.utils.resume_sections import split_sections
 
 logger = setup_logger(__name__)
 
+# Cached adapters so lists of models are serialized in a single pydantic-core pass
+_REQUIREMENTS_ADAPTER = TypeAdapter(List[Requirement])
+_GAPS_ADAPTER = TypeAdapter(List[Gap])
+_SUGGESTIONS_ADAPTER = TypeAdapter(List[TailoringSuggestion])
+
+
+class _PromptCacheLogger(BaseCallbackHandler):
+    """Log how much of each prompt OpenAI served from its prefix cache"""
+
+    # Only logs, so run it on the loop instead of the default executor
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        logger.debug(
+            f"LLM call used {usage.get('prompt_tokens', 0)} prompt tokens ({cached} cached)"
+        )
+
+
+@lru_cache(maxsize=None)
+def get_llm(http_async_client: Optional[httpx.AsyncClient] = None) -> ChatOpenAI:
+    """Return the process-wide chat model, creating it on first use
+
+    The model is backed by shared, keep-alive HTTP connection pools so
+    concurrent node calls reuse connections instead of opening new ones.
+    Pass the app's shared async client to have async calls use its pool;
+    one model is kept per client. The graph's nodes all call the model
+    asynchronously, so the sync client only serves direct invoke() calls.
+    """
+    limits = httpx.Limits(max_keepalive_connections=32)
+    # Use environment variables for API key (no hardcoded keys)
+    return ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0.0,  # Set temperature for deterministic outputs
+        api_key=settings.openai_api_key,
+        # The OpenAI client backs off on 429s and transient errors, honouring
+        # Retry-After, so rate limits cost latency instead of failing the node
+        max_retries=settings.llm_max_retries,
+        # Calls are deterministic (temperature 0), so repeats can be served from
+        # memory. Structured outputs are keyed by their bound schema too.
+        cache=InMemoryCache(maxsize=settings.llm_cache_size),
+        extra_body=(
+            {"service_tier": settings.openai_service_tier}
+            if settings.openai_service_tier
+            else None
+        ),
+        callbacks=[_PromptCacheLogger()],
+        http_client=httpx.Client(limits=limits),
+        http_async_client=http_async_client or httpx.AsyncClient(limits=limits),
+    )
+
+
+def render_resume_markdown(resume: StructuredResume) -> str:
+    """Format a structured resume as markdown"""
+    parts = []
+    append = parts.append
+
+    append(f"# {resume.name}\n\n")
+    append(f"## {resume.current_title}\n\n")
+    append(f"{resume.professional_summary}\n\n")
+
+    append("## Skills\n\n")
+    for skill in resume.skills:
+        append(f"- {skill}\n")
+
+    append("\n## Work Experience\n\n")
+    for job in resume.work_experience:
+        append(f"### {job.title} | {job.company}\n")
+        append(f"*{job.dates}*\n\n")
+
+        if job.projects:
+            append("**Key Projects:**\n\n")
+            for project in job.projects:
+                append(f"- **{project.name}**: {project.description}\n")
+
+        if job.accomplishments:
+            append("\n**Accomplishments:**\n\n")
+            for accomplishment in job.accomplishments:
+                append(f"- {accomplishment}\n")
+
+        append("\n")
+
+    append("\n## Education\n\n")
+    for edu in resume.education:
+        append(f"**{edu.degree}** - {edu.institution}, {edu.dates}\n\n")
+
+    return "".join(parts)
+
 
 class AgentState(BaseModel):
     job_description: str = ""
@@ -29,14 +144,15 @@ class AgentState(BaseModel):
     edit_section: str = ""  # Section to edit
     edit_content: str = ""  # Content to add/modify
     edit_completed: bool = False
-    company_context: CompanyContext = None
+    company_context: Optional[CompanyContext] = None
     requirements: List[Requirement] = []
+    resume_sections: Dict[str, str] = {}  # Resume text keyed by lower-cased heading
     matches: List[MatchedSkill] = []
     gaps: List[Gap] = []
     prioritized_improvements: List[PrioritizedImprovement] = []
     tailoring_suggestions: List[TailoringSuggestion] = []
     current_gap_index: int = 0  # Track which gap we're currently processing
-    current_suggestion: Optional[Dict] = None  # Current suggestion being reviewed
+    current_suggestion: Optional[TailoringSuggestion] = None  # Being reviewed
     human_feedback: Dict = {}
     tailored_resume: str = ""
     ats_score: float = 0.0
@@ -49,17 +165,48 @@ class AgentState(BaseModel):
 
 
 class ResumeTailoringAgent:
-    def __init__(self):
-        # Use environment variables for API key (no hardcoded keys)
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.0,  # Set temperature for deterministic outputs
-            api_key=settings.openai_api_key,
+    def __init__(
+        self,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.llm = get_llm(http_async_client)
+        # Runs are checkpointed per thread so a resume after human input picks
+        # up at the interrupt instead of re-running every node before it.
+        # AsyncSqliteSaver needs a running loop, so build the agent at startup.
+        self._checkpoint_conn = None
+        if checkpointer is None:
+            self._checkpoint_conn = aiosqlite.connect(settings.checkpoint_db_path)
+            checkpointer = AsyncSqliteSaver(self._checkpoint_conn)
+        self.checkpointer = checkpointer
+
+        # Structured output runnables are built once and shared across runs
+        # instead of regenerating the tool schema on every node call
+        self.intent_llm = self.llm.with_structured_output(
+            RequestAnalysis, method="json_schema", strict=True
+        )
+        self.job_analysis_llm = self.llm.with_structured_output(
+            JobAnalysis, method="json_schema", strict=True
+        )
+        self.match_llm = self.llm.with_structured_output(
+            RequirementMatches, method="json_schema", strict=True
+        )
+        self.prioritize_llm = self.llm.with_structured_output(
+            PrioritizedImprovements, method="json_schema", strict=True
+        )
+        # The model drafts suggestions; whether one is approved is decided in
+        # review, so that field isn't part of the schema it's asked to fill
+        self.suggestion_llm = self.llm.with_structured_output(
+            SuggestionDraft, method="json_schema", strict=True
         )
+        self.polish_llm = self.llm.with_structured_output(
+            PolishResult, method="json_schema", strict=True
+        )
+
         self.workflow = self._build_workflow()
 
-    def _build_workflow(self) -> StateGraph:
-        """Build and return the workflow graph"""
+    def _build_workflow(self) -> CompiledStateGraph:
+        """Build the workflow graph and compile it once for reuse across runs"""
         workflow = StateGraph(AgentState)
 
         # Add nodes
@@ -68,16 +215,15 @@ class ResumeTailoringAgent:
         workflow.add_node("extract_requirements", self.extract_requirements)
         workflow.add_node("analyze_resume", self.analyze_resume)
         workflow.add_node("prioritize_improvements", self.prioritize_improvements)
+        workflow.add_node("generate_suggestions", self.generate_suggestions)
         workflow.add_node("generate_suggestion", self.generate_suggestion_for_gap)
         workflow.add_node("request_verification", self.request_human_verification)
         workflow.add_node("process_feedback", self.process_human_feedback)
-        workflow.add_node("implement_changes", self.implement_changes)
-        workflow.add_node("ats_optimization", self.ats_optimization)
-        workflow.add_node("final_review", self.final_review)
+        workflow.add_node("polish", self.polish)
         workflow.add_node("generate_report", self.generate_report)
 
         # Add human-in-the-loop interrupt node
-        workflow.add_node("human_input", lambda x: x)
+        workflow.add_node("human_input", lambda state: {})
 
         # Add branching from intent detection
         workflow.add_conditional_edges(
@@ -95,11 +241,17 @@ class ResumeTailoringAgent:
         # Tailoring path with human-in-the-loop
         workflow.add_edge("extract_requirements", "analyze_resume")
         workflow.add_edge("analyze_resume", "prioritize_improvements")
-        workflow.add_edge("prioritize_improvements", "generate_suggestion")
+        workflow.add_edge("prioritize_improvements", "generate_suggestions")
+        workflow.add_edge("generate_suggestions", "generate_suggestion")
         workflow.add_edge("generate_suggestion", "request_verification")
 
-        # Add interrupt edge from request_verification to human_input
-        workflow.add_edge("request_verification", "human_input", interrupt=True)
+        # Only suggestions that need review stop at human_input, where the
+        # graph is interrupted until feedback arrives
+        workflow.add_conditional_edges(
+            "request_verification",
+            lambda state: "wait" if state.waiting_for_human else "skip",
+            {"wait": "human_input", "skip": "process_feedback"},
+        )
 
         # After human input is received, continue with process_feedback
         workflow.add_edge("human_input", "process_feedback")
@@ -108,66 +260,47 @@ class ResumeTailoringAgent:
         workflow.add_conditional_edges(
             "process_feedback",
             self.should_continue_processing,
-            {"continue": "generate_suggestion", "complete": "implement_changes"},
+            {"continue": "generate_suggestion", "complete": "polish"},
         )
 
-        workflow.add_edge("implement_changes", "ats_optimization")
-        workflow.add_edge("ats_optimization", "final_review")
-        workflow.add_edge("final_review", "generate_report")
+        workflow.add_edge("polish", "generate_report")
 
         # Set entry point and compile
         workflow.set_entry_point("detect_intent")
-        return workflow.compile()
-
-    def detect_intent(self, state: AgentState) -> AgentState:
-        """Determine if this is a tailoring request or a direct edit request"""
-
-        # If job description is empty or user specifically asks for an edit
-        # Define a proper pydantic model for structured output
+        return workflow.compile(
+            checkpointer=self.checkpointer, interrupt_before=["human_input"]
+        )
 
-        class EditDetails(BaseModel):
-            section: str = Field(description="Section of the resume to edit")
-            action: str = Field(description="Action to take: add, modify, or remove")
-            content: str = Field(description="Content to add or modify")
+    def _shared_context(self, state: AgentState) -> Dict[str, str]:
+        """Variables for the resume/job description block that opens resume prompts"""
+        return {"resume": state.resume, "job_description": state.job_description}
 
-        class RequestAnalysis(BaseModel):
-            request_type: str = Field(
-                description="Either 'tailor_resume' or 'direct_edit'"
-            )
-            edit_details: Optional[EditDetails] = Field(
-                None, description="Details for direct edit request"
+    async def detect_intent(self, state: AgentState) -> Dict:
+        """Determine if this is a tailoring request or a direct edit request"""
+        # A job description with no edit request can only mean tailoring, so
+        # the classifier is only consulted when there's a request to interpret.
+        # Repeated requests are answered from the model's response cache.
+        if not state.user_edit_request and state.job_description:
+            return {"request_type": RequestType.TAILOR_RESUME}
+
+        request_analysis = await self.intent_llm.ainvoke(
+            INTENT_PROMPT.format_messages(
+                user_request=state.user_edit_request or "No specific request provided",
+                has_job_description="Yes" if state.job_description else "No",
             )
-
-        intent_llm = self.llm.with_structured_output(RequestAnalysis)
-
-        request_analysis = intent_llm.invoke(f"""
-        Determine what the user wants to do with their resume based on this input:
-        
-        User request: {state.user_edit_request or "No specific request provided"}
-        Job description provided: {"Yes" if state.job_description else "No"}
-        
-        If the user is asking to make a specific edit to their resume (like adding a skill, 
-        updating a job description, etc.), classify this as a "direct_edit" and extract the details.
-        
-        If the user wants their resume tailored to a job description, classify this as "tailor_resume".
-        
-        Example direct edit requests:
-        - "Add Python to my skills section"
-        - "Update my job title at Google to Senior Engineer"
-        - "Remove my internship at Microsoft"
-        """)
+        )
 
         # Access the Pydantic model using dot notation instead of dictionary access
-        state.request_type = RequestType(request_analysis.request_type)
+        update = {"request_type": RequestType(request_analysis.request_type)}
 
         if (
-            state.request_type == RequestType.DIRECT_EDIT
+            update["request_type"] == RequestType.DIRECT_EDIT
             and request_analysis.edit_details
         ):
-            state.edit_section = request_analysis.edit_details.section
-            state.edit_content = request_analysis.edit_details.content
+            update["edit_section"] = request_analysis.edit_details.section
+            update["edit_content"] = request_analysis.edit_details.content
 
-        return state
+        return update
 
     def determine_next_step(self, state: AgentState) -> str:
         """Determine whether to follow the direct edit or tailoring path"""
@@ -175,29 +308,22 @@ class ResumeTailoringAgent:
             return "direct_edit"
         return "tailor_resume"
 
-    def process_direct_edit(self, state: AgentState) -> AgentState:
+    async def process_direct_edit(self, state: AgentState) -> Dict:
         """Make the requested edit directly to the resume"""
 
-        edit_llm = self.llm.invoke(f"""
-        Make the following edit to this resume:
-        
-        Resume:
-        {state.resume}
-        
-        Edit request: {state.user_edit_request}
-        Section to edit: {state.edit_section}
-        Edit content: {state.edit_content}
-        
-        Return the complete updated resume with this specific edit applied.
-        Make sure to maintain the same format and style as the original resume,
-        just with this single change applied.
-        """)
+        edit_llm = await self.llm.ainvoke(
+            DIRECT_EDIT_PROMPT.format_messages(
+                resume=state.resume,
+                user_edit_request=state.user_edit_request,
+                edit_section=state.edit_section,
+                edit_content=state.edit_content,
+            )
+        )
 
-        state.tailored_resume = edit_llm
-        state.edit_completed = True
+        tailored_resume = edit_llm.content
 
         # Generate a simple report about what was changed
-        state.output = f"""
+        output = f"""
         # Resume Edit Complete
         
         I've updated your resume by making the following change:
@@ -207,219 +333,192 @@ class ResumeTailoringAgent:
         
         ## Updated Resume
         
-        {state.tailored_resume}
+        {tailored_resume}
         """
 
-        return state
-
-    def extract_requirements(self, state: AgentState) -> AgentState:
-        """Extract requirements from job description"""
-        requirements_llm = self.llm.with_structured_output(List[Requirement])
-        logger.info("Extracting requirements from job description")
-        requirements = requirements_llm.invoke(f"""
-        Extract key requirements from this job description:
-        {state.job_description}
-        
-        For each requirement, specify:
-        1. The skill or qualification
-        2. Importance level (High/Medium/Low)
-        3. Required experience level
-        """)
-
-        state.requirements = requirements
-
-        # Get company context
-        context_llm = self.llm.with_structured_output(CompanyContext)
-        logger.info("Getting company context")
-        company_context = context_llm.invoke(f"""
-        Analyze this job description and identify:
-        1. Company culture and values
-        2. Industry specifics
-        3. Key terminology/buzzwords
-        4. Level of formality expected
-        5. Company size (Small/Medium/Large)
-        6. Technology stack mentioned
-        
-        Job description:
-        {state.job_description}
-        """)
+        return {
+            "tailored_resume": tailored_resume,
+            "edit_completed": True,
+            "output": output,
+        }
+
+    async def extract_requirements(self, state: AgentState) -> Dict:
+        """Extract requirements and company context from job description"""
+        logger.info("Extracting requirements and company context from job description")
+        job_analysis = await self.job_analysis_llm.ainvoke(
+            JOB_ANALYSIS_PROMPT.format_messages(job_description=state.job_description)
+        )
 
-        state.company_context = company_context
-        return state
+        return {
+            "requirements": job_analysis.requirements,
+            "company_context": job_analysis.company_context,
+            # Parsed once here so per-gap prompts can carry a single section
+            "resume_sections": split_sections(state.resume),
+        }
 
-    def analyze_resume(self, state: AgentState) -> AgentState:
+    async def analyze_resume(self, state: AgentState) -> Dict:
         """Analyze resume against job requirements"""
+        # Check requirements in batches: each call covers several requirements,
+        # and the batches decode concurrently behind the shared cached prefix
+        batch_size = settings.requirements_per_batch
+        prompts = [
+            ANALYZE_RESUME_PROMPT.format_messages(
+                **self._shared_context(state),
+                requirements=_REQUIREMENTS_ADAPTER.dump_json(
+                    state.requirements[i : i + batch_size]
+                ).decode(),
+            )
+            for i in range(0, len(state.requirements), batch_size)
+        ]
+        responses = await self.match_llm.abatch(
+            prompts, config={"max_concurrency": settings.max_concurrent_llm_calls}
+        )
+
+        requirements_by_skill = {req.skill: req for req in state.requirements}
         matches = []
         gaps = []
 
-        # Create structured output LLMs
-        match_llm = self.llm.with_structured_output(MatchedSkill)
-        gap_llm = self.llm.with_structured_output(Gap)
-
-        for req in state.requirements:
-            # First check if this is a match
-            prompt = f"""
-            Does this resume demonstrate {req.skill} at {req.experience_level} level?
-            
-            Resume:
-            {state.resume}
-            
-            If this skill IS demonstrated in the resume, respond with details about the match.
-            If this skill is NOT demonstrated adequately, respond with "NO_MATCH".
-            """
-
-            try:
-                response = match_llm.invoke(prompt)
-                if response != "NO_MATCH":
-                    # We have a match
-                    matches.append(response)
-                else:
-                    # We have a gap
-                    gap_prompt = f"""
-                    The resume does not adequately demonstrate {req.skill} at {req.experience_level} level.
-                    
-                    Resume:
-                    {state.resume}
-                    
-                    Analyze what evidence (if any) exists in the resume related to this skill,
-                    and which section it appears in.
-                    """
-                    gap = gap_llm.invoke(gap_prompt)
-                    gaps.append(
-                        Gap(
-                            skill=req.skill,
-                            required_level=req.experience_level,
-                            importance=req.importance,
-                            resume_evidence=gap.resume_evidence,
-                            section=gap.section,
-                            impact=f"Missing {req.skill} at {req.experience_level} level",
-                        )
+        for result in (r for response in responses for r in response.results):
+            if result.status == MatchStatus.MATCH:
+                # We have a match
+                matches.append(
+                    MatchedSkill(
+                        skill=result.skill,
+                        evidence=result.evidence,
+                        section=result.section,
+                        confidence=result.confidence,
+                        relevance=result.relevance,
                     )
-            except Exception as e:
-                print(f"Error analyzing requirement {req.skill}: {e}")
+                )
+                continue
+
+            # We have a gap
+            req = requirements_by_skill.get(result.skill)
+            if req is None:
+                logger.warning(f"Skipping result for unknown requirement {result.skill}")
                 continue
+            gaps.append(
+                Gap(
+                    skill=req.skill,
+                    required_level=req.experience_level,
+                    importance=req.importance,
+                    resume_evidence=result.evidence,
+                    section=result.section,
+                    impact=f"Missing {req.skill} at {req.experience_level} level",
+                )
+            )
 
-        state.matches = matches
-        state.gaps = gaps
-        state.current_gap_index = 0  # Initialize the gap index
-        return state
+        # Initialize the gap index alongside the fresh gap list
+        return {"matches": matches, "gaps": gaps, "current_gap_index": 0}
 
-    def prioritize_improvements(self, state: AgentState) -> AgentState:
+    async def prioritize_improvements(self, state: AgentState) -> Dict:
         """Prioritize which improvements will have the biggest impact"""
         # Sort gaps by importance and ability to address
-        prioritize_llm = self.llm.with_structured_output(List[PrioritizedImprovement])
-
-        prioritized = prioritize_llm.invoke(f"""
-        Analyze these skill gaps and prioritize which ones should be addressed in the resume:
-        
-        Gaps: {state.gaps}
-        Current resume: {state.resume}
-        
-        For each gap, determine:
-        1. Impact (high/medium/low) - how important is this for the job?
-        2. Addressability (high/medium/low) - can we reasonably tailor the resume to address this?
-        3. Priority (1-10 scale) - overall priority to fix
-        4. Approach - how should we address this gap?
-        5. Rationale - why is this improvement important?
-        """)
+        prioritized = await self.prioritize_llm.ainvoke(
+            PRIORITIZE_PROMPT.format_messages(
+                **self._shared_context(state),
+                gaps=_GAPS_ADAPTER.dump_json(state.gaps).decode(),
+            )
+        )
 
-        state.prioritized_improvements = prioritized
+        update = {"prioritized_improvements": prioritized.improvements}
 
         # Sort gaps by priority
-        if state.prioritized_improvements:
+        if prioritized.improvements:
             # Create a mapping of skill to priority
-            priority_map = {p.skill: p.priority for p in state.prioritized_improvements}
-
-            # Sort gaps by priority (highest first)
-            state.gaps = sorted(
-                state.gaps,
-                key=lambda gap: priority_map.get(gap.skill, 0),
-                reverse=True,
+            priority_map = {p.skill: p.priority for p in prioritized.improvements}
+
+            # Sort gaps by priority (highest first), in place since the list
+            # was built fresh by analyze_resume
+            state.gaps.sort(key=lambda gap: priority_map.get(gap.skill, 0), reverse=True)
+            update["gaps"] = state.gaps
+
+        return update
+
+    async def generate_suggestions(self, state: AgentState) -> Dict:
+        """Generate a suggestion for every gap up front"""
+        requirements = _REQUIREMENTS_ADAPTER.dump_json(state.requirements).decode()
+        prompts = [
+            SUGGESTION_PROMPT.format_messages(
+                job_description=state.job_description,
+                requirements=requirements,
+                # Gaps in sections the resume lacks (or can't be split into)
+                # still need the whole resume to place the change
+                resume=state.resume_sections.get(gap.section.lower(), state.resume),
+                gap=gap.model_dump_json(),
             )
-
-        return state
-
-    def generate_suggestion_for_gap(self, state: AgentState) -> AgentState:
-        """Generate a suggestion for the current gap"""
-        if state.current_gap_index >= len(state.gaps):
-            return state
-
-        current_gap = state.gaps[state.current_gap_index]
-        suggestion_llm = self.llm.with_structured_output(TailoringSuggestion)
-
-        suggestion = suggestion_llm.invoke(f"""
-        Create a specific suggestion to improve this resume based on the identified gap:
-        
-        Resume:
-        {state.resume}
-        
-        Gap:
-        {current_gap}
-        
-        Job requirements:
-        {state.requirements}
-        
-        Provide:
-        1. The skill being addressed
-        2. Exact section to modify
-        3. Original text (if any)
-        4. Suggested new text
-        5. Explanation of why this change helps
-        6. Confidence in suggestion (high/medium/low)
-        """)
-
-        if not state.tailoring_suggestions:
-            state.tailoring_suggestions = []
-
-        state.tailoring_suggestions.append(suggestion)
-        state.current_suggestion = suggestion.model_dump()
-        return state
-
-    def request_human_verification(self, state: AgentState) -> AgentState:
+            for gap in state.gaps
+        ]
+
+        # abatch keeps input order, so suggestions line up with state.gaps.
+        # max_concurrency bounds the fan-out so a long gap list doesn't trip
+        # rate limits.
+        drafts = await self.suggestion_llm.abatch(
+            prompts, config={"max_concurrency": settings.max_concurrent_llm_calls}
+        )
+        # Every suggestion starts unapproved; request_verification and
+        # process_feedback record the decision for each one
+        suggestions = [
+            TailoringSuggestion(**draft.model_dump(), approved=False) for draft in drafts
+        ]
+        return {"tailoring_suggestions": suggestions}
+
+    def generate_suggestion_for_gap(self, state: AgentState) -> Dict:
+        """Select the precomputed suggestion for the current gap"""
+        if state.current_gap_index >= len(state.tailoring_suggestions):
+            return {}
+
+        return {
+            "current_suggestion": state.tailoring_suggestions[state.current_gap_index]
+        }
+
+    def request_human_verification(self, state: AgentState) -> Dict:
         """Request human verification of the current suggestion"""
         if not state.current_suggestion:
-            return state
+            return {}
 
         # Create a verification request for the current suggestion
         suggestion = state.current_suggestion
 
         # Determine if this needs human verification
-        if suggestion["confidence"] == "high":
+        if suggestion.confidence == "high":
             # High confidence suggestions are automatically approved
-            suggestion["approved"] = True
-            state.human_feedback = {"current_response": {"answer": "Yes"}}
             # No need to interrupt for high confidence suggestions
-            state.waiting_for_human = False
-        else:
-            # Set up state for human interruption
-            state.waiting_for_human = True
-            state.step_name = "request_verification"
-            state.human_question = f"Should we make this change to the resume?\n\nOriginal: {suggestion['original_text']}\n\nSuggested: {suggestion['new_text']}\n\nRationale: {suggestion['explanation']}"
+            return {
+                "current_suggestion": suggestion.model_copy(update={"approved": True}),
+                "human_feedback": {"current_response": {"answer": "Yes"}},
+                "waiting_for_human": False,
+            }
+
+        # Set up state for human interruption
+        human_question = f"Should we make this change to the resume?\n\nOriginal: {suggestion.original_text}\n\nSuggested: {suggestion.new_text}\n\nRationale: {suggestion.explanation}"
 
+        return {
+            "waiting_for_human": True,
+            "step_name": "request_verification",
+            "human_question": human_question,
             # Create a verification request
-            state.human_feedback = {
+            "human_feedback": {
                 "current_response": None,
                 "pending_request": {
-                    "question": state.human_question,
+                    "question": human_question,
                     "options": ["Yes", "No", "Yes with modifications"],
                     "context": {
-                        "skill": suggestion["skill"],
-                        "section": suggestion["section"],
-                        "confidence": suggestion["confidence"],
+                        "skill": suggestion.skill,
+                        "section": suggestion.section,
+                        "confidence": suggestion.confidence,
                     },
                 },
-            }
-
+            },
             # Set output message for the frontend
-            state.output = f"Waiting for human verification on suggested change for {suggestion['skill']}"
+            "output": f"Waiting for human verification on suggested change for {suggestion.skill}",
+        }
 
-        return state
-
-    def process_human_feedback(self, state: AgentState) -> AgentState:
+    def process_human_feedback(self, state: AgentState) -> Dict:
         """Process feedback from human verification"""
         if not state.human_feedback.get("current_response"):
             # No feedback yet, keep waiting
-            return state
+            return {}
 
         # Get the current suggestion
         suggestion = state.current_suggestion
@@ -429,20 +528,29 @@ class ResumeTailoringAgent:
 
         if response["answer"] == "Yes":
             # Keep suggestion as is
-            suggestion["approved"] = True
+            suggestion = suggestion.model_copy(update={"approved": True})
         elif response["answer"] == "No":
             # Remove this suggestion
-            suggestion["approved"] = False
+            suggestion = suggestion.model_copy(update={"approved": False})
         elif response["answer"] == "Yes with modifications":
             # Update suggestion with human modifications
-            suggestion["new_text"] = response.get(
-                "modified_text", suggestion["new_text"]
+            suggestion = suggestion.model_copy(
+                update={
+                    "new_text": response.get("modified_text", suggestion.new_text),
+                    "approved": True,
+                }
             )
-            suggestion["approved"] = True
+
+        # Write the decision back so polish sees it
+        suggestions = list(state.tailoring_suggestions)
+        suggestions[state.current_gap_index] = suggestion
 
         # Move to the next gap
-        state.current_gap_index += 1
-        return state
+        return {
+            "current_suggestion": suggestion,
+            "tailoring_suggestions": suggestions,
+            "current_gap_index": state.current_gap_index + 1,
+        }
 
     def should_continue_processing(self, state: AgentState) -> str:
         """Determine if we should continue processing gaps"""
@@ -450,244 +558,147 @@ class ResumeTailoringAgent:
             return "continue"
         return "complete"
 
-    def implement_changes(self, state: AgentState) -> AgentState:
-        """Implement approved changes to create tailored resume"""
+    async def polish(self, state: AgentState) -> Dict:
+        """Apply approved changes, ATS optimization and final review in one pass"""
+        approved_suggestions = [s for s in state.tailoring_suggestions if s.approved]
+
+        # With nothing to apply, a resume that already covers the required
+        # skills would only be rewritten for style, so skip the full-resume
+        # call. The resume is then returned as submitted rather than
+        # re-rendered as markdown, and the notes say so.
+        if not approved_suggestions:
+            coverage = skill_coverage(
+                state.resume, (req.skill for req in state.requirements)
+            )
+            if coverage >= settings.skill_coverage_target:
+                logger.info(f"Skipping polish: no approved changes, skill coverage {coverage}")
+                return {
+                    "tailored_resume": state.resume,
+                    "ats_score": ats_score(state.resume, state.job_description),
+                    "final_notes": [
+                        f"Already mentions {coverage:g}% of the job's required "
+                        "skills; returned unchanged"
+                    ],
+                }
+
+        # Every change here is approved, so the flag would only be noise
         changes_by_section = {}
-        for suggestion in state.tailoring_suggestions:
-            if suggestion.approved:
-                section = suggestion.section
-                if section not in changes_by_section:
-                    changes_by_section[section] = []
-                changes_by_section[section].append(suggestion.model_dump())
-
-        updated_resume = self.llm.invoke(f"""
-        Update this resume with the following changes to create a tailored version:
-        
-        Current resume:
-        {state.resume}
-        
-        Changes to make by section:
-        {changes_by_section}
-        
-        Requirements from job:
-        {state.requirements}
-        
-        Company context:
-        {state.company_context}
-        
-        FORMAT THE RESULT WITH THESE SECTIONS in this order:
-        1. Full name at the top
-        2. Current professional title
-        3. Professional summary (concise paragraph highlighting key qualifications)
-        4. Skills (comprehensive list of technical and soft skills relevant to the job)
-        5. Work Experience (chronological, with company, title, dates, and key projects/accomplishments)
-        6. Education (degrees, institutions, and dates)
-        
-        Make sure to integrate all the approved changes while maintaining this structure.
-        """)
-
-        state.tailored_resume = updated_resume
-        return state
+        for change in _SUGGESTIONS_ADAPTER.dump_python(
+            approved_suggestions, exclude={"__all__": {"approved"}}
+        ):
+            changes_by_section.setdefault(change["section"], []).append(change)
+
+        result = await self.polish_llm.ainvoke(
+            POLISH_PROMPT.format_messages(
+                **self._shared_context(state),
+                # Prompt inputs are JSON, not Python reprs, like the lists above
+                changes_by_section=orjson.dumps(changes_by_section).decode(),
+                requirements=_REQUIREMENTS_ADAPTER.dump_json(state.requirements).decode(),
+                company_context=(
+                    state.company_context.model_dump_json()
+                    if state.company_context
+                    else "null"
+                ),
+            )
+        )
 
-    def ats_optimization(self, state: AgentState) -> AgentState:
-        """Optimize resume for ATS systems"""
-        ats_llm = self.llm.with_structured_output(ATSAnalysis)
+        tailored_resume = render_resume_markdown(result.resume)
+        return {
+            "tailored_resume": tailored_resume,
+            # Keyword coverage is plain counting, so it's computed here rather
+            # than having the model decode (and guess at) the numbers
+            "ats_score": ats_score(tailored_resume, state.job_description),
+            "final_notes": result.strengths,
+        }
 
-        ats_analysis = ats_llm.invoke(f"""
-        Analyze this resume for ATS optimization:
-        {state.tailored_resume}
-        
-        Job description:
-        {state.job_description}
-        
-        Check for:
-        1. Keyword density compared to job description
-        2. Use of industry-standard job titles
-        3. Proper formatting that won't confuse ATS systems
-        4. Appropriate use of bullet points and sections
-        """)
-
-        state.ats_score = ats_analysis.score
-
-        if ats_analysis.score < 80:
-            optimized = self.llm.invoke(f"""
-            Update this resume to improve ATS compatibility by addressing these issues:
-            
-            Current resume:
-            {state.tailored_resume}
-            
-            Improvements needed:
-            {ats_analysis.improvements}
-            
-            Return the complete updated resume with better ATS optimization.
-            """)
-            state.tailored_resume = optimized
-
-        return state
-
-    def final_review(self, state: AgentState) -> AgentState:
-        """Final review and polish of the resume"""
-        review_llm = self.llm.with_structured_output(FinalReview)
-
-        final_review = review_llm.invoke(f"""
-        Perform a final review of this tailored resume:
-        {state.tailored_resume}
-        
-        Job description:
-        {state.job_description}
-        
-        Check for:
-        1. Overall coherence and flow
-        2. Appropriate highlighting of key qualifications
-        3. Consistency in formatting and style
-        4. Grammar and spelling
-        5. Appropriate length and detail level
-        """)
-
-        if final_review.adjustments:
-            polished = self.llm.invoke(f"""
-            Make these final adjustments to the resume:
-            
-            Current resume:
-            {state.tailored_resume}
-            
-            Adjustments:
-            {final_review.adjustments}
-            
-            Return the complete finalized resume.
-            """)
-            state.tailored_resume = polished
-
-        state.final_notes = final_review.strengths
-        return state
-
-    def generate_report(self, state: AgentState) -> AgentState:
+    def generate_report(self, state: AgentState) -> Dict:
         """Generate final tailored resume with summary in markdown format"""
         # If this was a direct edit, we already have the output
         if state.edit_completed:
-            return state
+            return {}
+
+        approved_suggestions = [s for s in state.tailoring_suggestions if s.approved]
+        addressed_skills = {s.skill for s in approved_suggestions}
+        addressed_gaps = sum(1 for g in state.gaps if g.skill in addressed_skills)
 
-        summary = f"""
+        summary_parts = [
+            f"""
         # Resume Tailoring Summary
         
         ## Job Fit Analysis
         - Matched Skills: {len(state.matches)}
-        - Addressed Gaps: {len([g for g in state.gaps if g.skill in [s.skill for s in state.tailoring_suggestions]])}
+        - Addressed Gaps: {addressed_gaps}
         - ATS Compatibility Score: {state.ats_score}/100
         
         ## Key Improvements Made
         """
+        ]
 
-        for suggestion in state.tailoring_suggestions:
-            if suggestion.approved:
-                summary += f"- {suggestion.section}: {suggestion.explanation}\n"
+        for suggestion in approved_suggestions:
+            summary_parts.append(f"- {suggestion.section}: {suggestion.explanation}\n")
 
-        summary += "\n## Resume Strengths\n"
+        summary_parts.append("\n## Resume Strengths\n")
         for note in state.final_notes:
-            summary += f"- {note}\n"
-
-        resume_structure_llm = self.llm.with_structured_output(dict)
-
-        resume_components = resume_structure_llm.invoke(f"""
-        Extract the following components from this resume:
-        - name: The candidate's full name
-        - current_title: Their current professional title
-        - professional_summary: A paragraph summarizing their professional background
-        - skills: A comprehensive list of all skills mentioned (technical and soft skills)
-        - work_experience: List of all work experiences with company, title, dates, and key projects/accomplishments
-        - education: List of educational background with degree, institution, and dates
-        
-        Resume:
-        {state.tailored_resume}
-        
-        Return these components in a structured format.
-        """)
-
-        # Format the resume in markdown
-        final_resume_markdown = f"# {resume_components['name']}\n\n"
-        final_resume_markdown += f"## {resume_components['current_title']}\n\n"
-        final_resume_markdown += f"{resume_components['professional_summary']}\n\n"
-
-        final_resume_markdown += "## Skills\n\n"
-        skills = resume_components["skills"]
-        if isinstance(skills, list):
-            for skill in skills:
-                final_resume_markdown += f"- {skill}\n"
-        else:
-            final_resume_markdown += f"{skills}\n"
-
-        final_resume_markdown += "\n## Work Experience\n\n"
-        work_exp = resume_components["work_experience"]
-
-        if isinstance(work_exp, list):
-            for job in work_exp:
-                final_resume_markdown += (
-                    f"### {job.get('title')} | {job.get('company')}\n"
-                )
-                final_resume_markdown += f"*{job.get('dates')}*\n\n"
-
-                if "projects" in job and isinstance(job["projects"], list):
-                    final_resume_markdown += "**Key Projects:**\n\n"
-                    for project in job["projects"]:
-                        final_resume_markdown += f"- **{project.get('name', 'Project')}**: {project.get('description', '')}\n"
-
-                if "accomplishments" in job and isinstance(
-                    job["accomplishments"], list
-                ):
-                    final_resume_markdown += "\n**Accomplishments:**\n\n"
-                    for accomplishment in job["accomplishments"]:
-                        final_resume_markdown += f"- {accomplishment}\n"
-
-                final_resume_markdown += "\n"
-        else:
-            final_resume_markdown += f"{work_exp}\n"
-
-        final_resume_markdown += "\n## Education\n\n"
-        education = resume_components["education"]
-        if isinstance(education, list):
-            for edu in education:
-                final_resume_markdown += f"**{edu.get('degree')}** - {edu.get('institution')}, {edu.get('dates')}\n\n"
-        else:
-            final_resume_markdown += f"{education}\n"
-
-        state.output = f"{summary}\n\n## Final Tailored Resume\n{final_resume_markdown}"
-        return state
-
-    async def run(self, initial_state: AgentState) -> AgentState:
-        """Run the workflow with the given initial state"""
-        # If we have human feedback, we're resuming from an interrupt
-        if initial_state.human_feedback and initial_state.waiting_for_human:
-            # Reset the waiting flag since we're continuing with human input
-            initial_state.waiting_for_human = False
-
-            # Try different async methods based on the LangGraph version
-            try:
-                # First try the newer method with the human_input node
-                return await self.workflow.ainvoke(
-                    initial_state, {"checkpoint": "human_input"}
-                )
-            except (AttributeError, ValueError):
-                try:
-                    # Then try the alternative method
-                    return await self.workflow.invoke_async(
-                        initial_state, {"checkpoint": "human_input"}
-                    )
-                except (AttributeError, ValueError):
-                    # Fall back to compiled graph method
-                    compiled = self.workflow.compile()
-                    return await compiled.ainvoke(
-                        initial_state, {"checkpoint": "human_input"}
-                    )
-        else:
-            # Starting from the beginning
-            try:
-                # First try the newer method
-                return await self.workflow.ainvoke(initial_state)
-            except AttributeError:
-                try:
-                    # Then try the alternative method
-                    return await self.workflow.invoke_async(initial_state)
-                except AttributeError:
-                    # Fall back to compiled graph method
-                    compiled = self.workflow.compile()
-                    return await compiled.ainvoke(initial_state)
+            summary_parts.append(f"- {note}\n")
+
+        summary = "".join(summary_parts)
+
+        return {
+            "output": f"{summary}\n\n## Final Tailored Resume\n{state.tailored_resume}"
+        }
+
+    async def run(self, initial_state: AgentState, thread_id: str) -> AgentState:
+        """Run the workflow from the start until it completes or needs human input"""
+        return await self._invoke(initial_state, thread_id)
+
+    async def is_waiting_for_feedback(self, thread_id: str) -> bool:
+        """Whether the thread's run is paused at human_input"""
+        config = {"configurable": {"thread_id": thread_id}}
+        snapshot = await self.workflow.aget_state(config)
+        return snapshot.next == ("human_input",)
+
+    async def resume(self, thread_id: str, feedback: Dict) -> AgentState:
+        """Continue a run interrupted at human_input with the given feedback
+
+        Only valid while is_waiting_for_feedback(thread_id) is true.
+        """
+        config = {"configurable": {"thread_id": thread_id}}
+        # Record the feedback as human_input's output so the checkpointed run
+        # continues at process_feedback
+        await self.workflow.aupdate_state(
+            config,
+            {"human_feedback": feedback, "waiting_for_human": False},
+            as_node="human_input",
+        )
+        return await self._invoke(None, thread_id)
+
+    async def thread_ids(self) -> List[str]:
+        """IDs of every thread with checkpoints in the SQLite store"""
+        # Creates the tables if nothing has been checkpointed yet
+        await self.checkpointer.setup()
+        async with self.checkpointer.conn.execute(
+            "SELECT DISTINCT thread_id FROM checkpoints"
+        ) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def delete_thread(self, thread_id: str):
+        """Drop a thread's checkpoints once its run can no longer be resumed"""
+        await self.checkpointer.adelete_thread(thread_id)
+
+    async def aclose(self):
+        """Close the checkpoint database connection opened by this agent"""
+        if self._checkpoint_conn is not None:
+            await self._checkpoint_conn.close()
+
+    async def _invoke(
+        self, input_state: Optional[AgentState], thread_id: str
+    ) -> AgentState:
+        """Invoke the compiled graph on the checkpoint thread for this session"""
+        result = await self.workflow.ainvoke(
+            input_state, {"configurable": {"thread_id": thread_id}}
+        )
+
+        # The compiled graph returns its channel values as a plain dict; rebuild
+        # the model once at this boundary so callers keep attribute access and
+        # model_dump() without the nodes paying for it on every edge.
+        return AgentState.model_validate(result)
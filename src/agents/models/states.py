@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Dict, List
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -10,6 +10,11 @@ class RequestType(str, Enum):
     DIRECT_EDIT = "direct_edit"
 
 
+class MatchStatus(str, Enum):
+    MATCH = "match"
+    GAP = "gap"
+
+
 class Requirement(BaseModel):
     skill: str
     importance: str = Field(description="High, Medium, or Low importance")
@@ -26,6 +31,27 @@ class MatchedSkill(BaseModel):
     )
 
 
+class BatchedMatchResult(BaseModel):
+    skill: str
+    status: MatchStatus = Field(
+        description="'match' if the resume demonstrates this skill, otherwise 'gap'"
+    )
+    evidence: str = Field(description="Evidence from resume or 'None found'")
+    section: str = Field(
+        description="Which section contains this evidence or 'Missing'"
+    )
+    confidence: str = Field(description="high, medium, or low")
+    relevance: str = Field(
+        description="How directly the evidence relates to the requirement"
+    )
+
+
+class RequirementMatches(BaseModel):
+    results: List[BatchedMatchResult] = Field(
+        description="One result per job requirement"
+    )
+
+
 class Gap(BaseModel):
     skill: str
     required_level: str
@@ -50,13 +76,25 @@ class PrioritizedImprovement(BaseModel):
     rationale: str = Field(description="Why this improvement is important")
 
 
-class TailoringSuggestion(BaseModel):
+class PrioritizedImprovements(BaseModel):
+    improvements: List[PrioritizedImprovement] = Field(
+        description="Prioritized improvements, one per skill gap"
+    )
+
+
+class SuggestionDraft(BaseModel):
+    """A suggested change as generated by the model, before review"""
+
     skill: str
     section: str = Field(description="Resume section to modify")
     original_text: str = Field(description="Original text from resume, if any")
     new_text: str = Field(description="Suggested new text")
     explanation: str = Field(description="Why this change helps")
     confidence: str = Field(description="high, medium, or low")
+
+
+class TailoringSuggestion(SuggestionDraft):
+    # Set by review, never by the model
     approved: bool = True
 
 
@@ -69,25 +107,61 @@ class CompanyContext(BaseModel):
     tech_stack: List[str] = Field(description="List of technologies used")
 
 
-class ATSAnalysis(BaseModel):
-    score: float = Field(description="ATS compatibility score (0-100)")
-    keyword_density: Dict[str, float] = Field(
-        description="Keyword frequency compared to job description"
-    )
-    job_title_matches: List[str] = Field(
-        description="Industry-standard job titles found"
+class JobAnalysis(BaseModel):
+    requirements: List[Requirement] = Field(
+        description="Key requirements extracted from the job description"
     )
-    format_issues: List[str] = Field(
-        description="Formatting issues that might confuse ATS"
+    company_context: CompanyContext
+
+
+class Project(BaseModel):
+    name: str
+    description: str
+
+
+class WorkExperience(BaseModel):
+    title: str
+    company: str
+    dates: str
+    projects: List[Project] = Field(description="Key projects, if any")
+    accomplishments: List[str] = Field(description="Key accomplishments, if any")
+
+
+class Education(BaseModel):
+    degree: str
+    institution: str
+    dates: str
+
+
+class StructuredResume(BaseModel):
+    name: str = Field(description="The candidate's full name")
+    current_title: str = Field(description="Their current professional title")
+    professional_summary: str = Field(
+        description="A paragraph summarizing their professional background"
     )
-    improvements: List[str] = Field(
-        description="Specific improvements to increase ATS compatibility"
+    skills: List[str] = Field(
+        description="All skills mentioned (technical and soft skills)"
     )
+    work_experience: List[WorkExperience]
+    education: List[Education]
 
 
-class FinalReview(BaseModel):
-    adjustments: List[str] = Field(description="Final adjustments to make")
+class PolishResult(BaseModel):
+    resume: StructuredResume = Field(description="The complete finalized resume")
     strengths: List[str] = Field(
         description="Notes on strengths of the tailored resume"
     )
-    confidence: str = Field(description="Confidence level that resume is well-tailored")
+
+
+class EditDetails(BaseModel):
+    section: str = Field(description="Section of the resume to edit")
+    action: str = Field(description="Action to take: add, modify, or remove")
+    content: str = Field(description="Content to add or modify")
+
+
+class RequestAnalysis(BaseModel):
+    request_type: str = Field(description="Either 'tailor_resume' or 'direct_edit'")
+    # Required but nullable: strict structured outputs allow no defaults
+    edit_details: Optional[EditDetails] = Field(
+        description="Details for direct edit request, or null"
+    )
@@ -0,0 +1,171 @@
+from langchain_core.prompts import ChatPromptTemplate
+
+# Invariant resume/job description block sent as the system message of every
+# resume prompt. OpenAI caches prompt prefixes automatically, so keeping these
+# inputs first and byte-identical lets repeat calls in a run reuse them, while
+# the short task-specific part follows as the user message.
+_SHARED_CONTEXT = """Resume:
+{resume}
+
+Job description:
+{job_description}
+"""
+
+
+def _with_shared_context(task: str) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(
+        [("system", _SHARED_CONTEXT), ("human", task)]
+    )
+
+
+INTENT_PROMPT = ChatPromptTemplate.from_template("""
+Determine what the user wants to do with their resume based on this input:
+
+User request: {user_request}
+Job description provided: {has_job_description}
+
+If the user is asking to make a specific edit to their resume (like adding a skill,
+updating a job description, etc.), classify this as a "direct_edit" and extract the details.
+
+If the user wants their resume tailored to a job description, classify this as "tailor_resume".
+
+Example direct edit requests:
+- "Add Python to my skills section"
+- "Update my job title at Google to Senior Engineer"
+- "Remove my internship at Microsoft"
+""")
+
+DIRECT_EDIT_PROMPT = ChatPromptTemplate.from_template("""
+Make the following edit to this resume:
+
+Resume:
+{resume}
+
+Edit request: {user_edit_request}
+Section to edit: {edit_section}
+Edit content: {edit_content}
+
+Return the complete updated resume with this specific edit applied.
+Make sure to maintain the same format and style as the original resume,
+just with this single change applied.
+""")
+
+JOB_ANALYSIS_PROMPT = ChatPromptTemplate.from_template("""
+Analyze this job description:
+{job_description}
+
+Extract the key requirements. For each requirement, specify:
+1. The skill or qualification
+2. Importance level (High/Medium/Low)
+3. Required experience level
+
+Also identify the company context:
+1. Company culture and values
+2. Industry specifics
+3. Key terminology/buzzwords
+4. Level of formality expected
+5. Company size (Small/Medium/Large)
+6. Technology stack mentioned
+""")
+
+ANALYZE_RESUME_PROMPT = _with_shared_context("""
+For each of the job requirements below, decide whether the resume
+demonstrates the skill at the required experience level.
+
+Requirements (JSON):
+{requirements}
+
+Return one result per requirement, using the requirement's skill name as given.
+Set status to "match" only if the skill IS demonstrated adequately,
+otherwise set it to "gap".
+For every requirement, describe the evidence (if any) that exists in the resume
+related to this skill ("None found" if there is none), and which section it
+appears in ("Missing" if it does not appear).
+""")
+
+PRIORITIZE_PROMPT = _with_shared_context("""
+Analyze these skill gaps and prioritize which ones should be addressed in the resume:
+
+Gaps: {gaps}
+
+For each gap, determine:
+1. Impact (high/medium/low) - how important is this for the job?
+2. Addressability (high/medium/low) - can we reasonably tailor the resume to address this?
+3. Priority (1-10 scale) - overall priority to fix
+4. Approach - how should we address this gap?
+5. Rationale - why is this improvement important?
+""")
+
+# Per-gap prompts lead with the inputs shared by every gap so the cached prefix
+# covers them, and carry only the resume section the gap concerns
+SUGGESTION_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """Job description:
+{job_description}
+
+Job requirements:
+{requirements}
+""",
+        ),
+        (
+            "human",
+            """Relevant resume text:
+{resume}
+
+Create a specific suggestion to improve the resume text above based on the identified gap:
+
+Gap:
+{gap}
+
+Provide:
+1. The skill being addressed
+2. Exact section to modify
+3. Original text (if any)
+4. Suggested new text
+5. Explanation of why this change helps
+6. Confidence in suggestion (high/medium/low)
+""",
+        ),
+    ]
+)
+
+POLISH_PROMPT = _with_shared_context("""
+Create the final tailored version of the resume.
+
+Changes to make by section:
+{changes_by_section}
+
+Requirements from job:
+{requirements}
+
+Company context:
+{company_context}
+
+FORMAT THE RESULT WITH THESE SECTIONS in this order:
+1. Full name at the top
+2. Current professional title
+3. Professional summary (concise paragraph highlighting key qualifications)
+4. Skills (comprehensive list of technical and soft skills relevant to the job)
+5. Work Experience (chronological, with company, title, dates, and key projects/accomplishments)
+6. Education (degrees, institutions, and dates)
+
+Make sure to integrate all the approved changes while maintaining this structure.
+
+While writing it, optimize for ATS systems:
+1. Keyword density compared to job description
+2. Use of industry-standard job titles
+3. Proper formatting that won't confuse ATS systems
+4. Appropriate use of bullet points and sections
+
+And give it a final review for:
+1. Overall coherence and flow
+2. Appropriate highlighting of key qualifications
+3. Consistency in formatting and style
+4. Grammar and spelling
+5. Appropriate length and detail level
+
+Return the complete finalized resume, split into these sections, and notes on
+its strengths.
+""")
@@ -1,19 +1,31 @@
 import uuid
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+import orjson
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 
-from src.utils.job_scraper import scrape_job_details
+from src.agents.agent import AgentState
+
+from src.utils.job_scraper import scrape_job_details_cached
 from src.utils.logger_config import setup_logger
-from src.utils.parse_pdf import parse_resume_pdf
+from src.utils.parse_pdf import parse_resume_pdfs
 
-from ..services.tailoring_service import TailoringService
+from ..services.tailoring_service import (
+    SessionNotFoundError,
+    SessionNotWaitingError,
+    TailoringService,
+)
 
 logger = setup_logger(__name__)
 
 router = APIRouter()
-tailoring_service = TailoringService()
+
+
+def get_tailoring_service(request: Request) -> TailoringService:
+    """Return the service created for this worker at app startup"""
+    return request.app.state.tailoring_service
 
 
 class TailoringRequest(BaseModel):
@@ -25,47 +37,77 @@ class FeedbackRequest(BaseModel):
     feedback: Dict
 
 
+def _state_json(state: AgentState) -> orjson.Fragment:
+    """Embed a state's own JSON encoding in an orjson response unchanged"""
+    # model_dump_json serializes in one pass; a dict from model_dump() would be
+    # built only to be walked again by the response encoder
+    return orjson.Fragment(state.model_dump_json())
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists the given ETag
+
+    Uses the weak comparison RFC 9110 requires for If-None-Match, so W/
+    prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
 @router.post("/tailoring-sessions/")
-async def create_tailoring_session(request: TailoringRequest):
+async def create_tailoring_session(
+    request: TailoringRequest,
+    tailoring_service: TailoringService = Depends(get_tailoring_service),
+):
     try:
         # Generate a unique session ID
         session_id = str(uuid.uuid4())
 
-        # Start the tailoring process
+        # Start the tailoring process; the service saves the session state
+        # and sends the WebSocket update
         result = await tailoring_service.start_tailoring(
-            resume=request.resume, job_description=request.job_description
+            session_id=session_id,
+            resume=request.resume,
+            job_description=request.job_description,
         )
 
-        # Save the state and send WebSocket update
-        await tailoring_service.save_session_state(session_id, result)
-
-        return {
-            "id": session_id,
-            "status": "started",
-            "initial_state": result.model_dump(),
-            "websocket_url": f"ws://localhost:8000/ws/{session_id}"
-        }
+        return ORJSONResponse(
+            {
+                "id": session_id,
+                "status": "started",
+                "initial_state": _state_json(result),
+                "websocket_url": f"ws://localhost:8000/ws/{session_id}",
+            }
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/upload-resume-and-job/")
 async def upload_resume_and_job(
-    resume_file: UploadFile = File(...),
+    # Usually a single PDF; a resume split across several files is parsed
+    # in parallel worker processes and joined in upload order
+    resume_file: List[UploadFile] = File(...),
     job_url: Optional[str] = Form(None),
     job_description: Optional[str] = Form(None),
+    tailoring_service: TailoringService = Depends(get_tailoring_service),
 ):
     logger.info("Starting upload and tailoring process", 5 * "*")
     try:
         # Parse the uploaded resume PDF
         logger.info("Parsing resume PDF")
-        resume_text = await parse_resume_pdf(resume_file)
+        resume_text = "\n\n".join(await parse_resume_pdfs(resume_file))
 
         # Get job description either from URL or direct input
         logger.info("Getting job description")
         job_desc_text = ""
         if job_url:
-            job_desc_text = await scrape_job_details(job_url)
+            job_desc_text = await scrape_job_details_cached(job_url)
         elif job_description:
             job_desc_text = job_description
         else:
@@ -77,27 +119,33 @@ async def upload_resume_and_job(
         # Generate a unique session ID
         session_id = str(uuid.uuid4())
 
-        # Start the tailoring process
+        # Start the tailoring process; the service saves the session state
+        # and sends the WebSocket update
         logger.info("Starting tailoring process")
         result = await tailoring_service.start_tailoring(
-            resume=resume_text, job_description=job_desc_text
+            session_id=session_id, resume=resume_text, job_description=job_desc_text
         )
 
-        # Save the state and send WebSocket update
-        await tailoring_service.save_session_state(session_id, result)
-
-        return {
-            "id": session_id,
-            "status": "started",
-            "initial_state": result.model_dump(),
-            "websocket_url": f"ws://localhost:8000/ws/{session_id}"
-        }
+        return ORJSONResponse(
+            {
+                "id": session_id,
+                "status": "started",
+                "initial_state": _state_json(result),
+                "websocket_url": f"ws://localhost:8000/ws/{session_id}",
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/tailoring-sessions/{session_id}/feedback")
-async def provide_feedback(session_id: str, request: FeedbackRequest):
+async def provide_feedback(
+    session_id: str,
+    request: FeedbackRequest,
+    tailoring_service: TailoringService = Depends(get_tailoring_service),
+):
     try:
         # Process the feedback
         result = await tailoring_service.provide_feedback(
@@ -107,18 +155,40 @@ async def provide_feedback(session_id: str, request: FeedbackRequest):
         # Save the updated state and send WebSocket update
         await tailoring_service.save_session_state(session_id, result)
 
-        return {"status": "success", "state": result.model_dump()}
+        return ORJSONResponse({"status": "success", "state": _state_json(result)})
+    except SessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SessionNotWaitingError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/tailoring-sessions/{session_id}")
-async def get_session_state(session_id: str):
+async def get_session_state(
+    session_id: str,
+    request: Request,
+    tailoring_service: TailoringService = Depends(get_tailoring_service),
+):
     try:
-        state = tailoring_service.get_session_state(session_id)
-        if not state:
+        state_json, etag = await tailoring_service.get_session_json_and_etag(
+            session_id
+        )
+        if state_json is None:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        return {"id": session_id, "state": state.model_dump()}
+        # Pollers that already have the current state get a bodiless 304
+        if etag is not None and _etag_matches(
+            request.headers.get("if-none-match"), etag
+        ):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        # The stored JSON is sent as-is, without decoding it into a model
+        headers = {"ETag": etag} if etag is not None else None
+        return ORJSONResponse(
+            {"id": session_id, "state": orjson.Fragment(state_json)}, headers=headers
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,59 @@
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
+import httpx
+import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from .api.routes import router as api_router
+from .services.tailoring_service import TailoringService
 from .websockets.connection_manager import connection_manager
+from src.config.settings import settings
+from src.utils.blocking import get_blocking_executor
 from src.utils.logger_config import setup_logger
 
 logger = setup_logger(__name__)
 
-app = FastAPI(title="Resume Tailoring")
+
+async def _prune_checkpoints(service: TailoringService):
+    """Periodically drop checkpoints of sessions that have expired"""
+    while True:
+        try:
+            await service.prune_checkpoints()
+        except Exception as e:
+            logger.error(f"Error pruning checkpoints: {str(e)}")
+        await asyncio.sleep(settings.session_ttl_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Outbound LLM calls share one HTTP/2 connection pool per worker
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+    # One service, and so one agent and compiled graph, per worker process
+    app.state.tailoring_service = TailoringService(http_client=app.state.http)
+    pruner = asyncio.create_task(_prune_checkpoints(app.state.tailoring_service))
+    yield
+    # Let an in-progress sweep unwind before its connection is closed
+    pruner.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await pruner
+    await app.state.tailoring_service.aclose()
+    await app.state.http.aclose()
+    get_blocking_executor().shutdown(wait=False)
+
+
+app = FastAPI(
+    title="Resume Tailoring",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -23,19 +69,34 @@ app.include_router(api_router, prefix="/api/v1")
 
 
 @app.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
+async def websocket_endpoint(websocket: WebSocket, session_id: str, format: str = "json"):
     try:
         logger.info(f"WebSocket connection request for session {session_id}")
-        await connection_manager.connect(session_id, websocket)
-        
-        # Keep the connection alive until client disconnects
-        while True:
-            # Wait for any message from the client (just to detect disconnection)
-            await websocket.receive_text()
-            
+        # Clients opt in to binary msgpack frames with ?format=msgpack
+        await connection_manager.connect(
+            session_id, websocket, msgpack=format == "msgpack"
+        )
+
+        # Keep the connection alive until either side closes it
+        await connection_manager.wait_closed(session_id, websocket)
+        logger.info(f"WebSocket disconnected for session {session_id}")
+        connection_manager.disconnect(session_id, websocket)
+
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for session {session_id}")
-        connection_manager.disconnect(session_id)
+        connection_manager.disconnect(session_id, websocket)
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {str(e)}")
-        connection_manager.disconnect(session_id)
+        connection_manager.disconnect(session_id, websocket)
+
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "src.backend.main:app",
+        host=settings.api_host,
+        port=settings.api_port,
+        workers=settings.api_workers,
+        reload=settings.api_reload,
+        loop="uvloop",
+        http="httptools",
+    )
@@ -1,85 +1,197 @@
-from typing import Dict, Optional
+import hashlib
+from typing import Dict, Optional, Tuple
+
+import httpx
+import orjson
+import ormsgpack
 
 from src.agents.agent import AgentState, ResumeTailoringAgent
 from src.backend.websockets.connection_manager import connection_manager
+from src.config.settings import settings
 from src.utils.logger_config import setup_logger
+from src.utils.redis_client import get_redis
 
 logger = setup_logger(__name__)
 
 
+class SessionNotFoundError(Exception):
+    """No state is stored for the session, or it has expired"""
+
+
+class SessionNotWaitingError(Exception):
+    """Feedback was given for a session that isn't paused for review"""
+
+
 class TailoringService:
-    def __init__(self):
-        self.agent = ResumeTailoringAgent()
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.agent = ResumeTailoringAgent(http_async_client=http_client)
+
+    async def start_tailoring(
+        self, session_id: str, resume: str, job_description: str
+    ) -> AgentState:
+        """Start the tailoring process and save the session's state"""
+        # Identical inputs produce the same result, so a finished run for the
+        # same resume and job description is reused outright
+        result_key = self._result_key(resume, job_description)
+        cached = await get_redis().get(result_key)
+        if cached is not None:
+            logger.info("Reusing tailoring result for identical inputs")
+            result = AgentState.model_validate_json(cached)
+            await self.save_session_state(session_id, result)
+            return result
 
-    async def start_tailoring(self, resume: str, job_description: str) -> Dict:
-        """Start the tailoring process"""
         initial_state = AgentState(
             resume=resume,
             job_description=job_description,
             step_name="start"
         )
         logger.info("Starting tailoring process")
-        # Run until human input is needed
-        result = await self.agent.run(initial_state)
-        
-        # Check if we need human input
-        if result.waiting_for_human:
-            logger.info(f"Waiting for human input: {result.human_question}")
-        else:
-            logger.info("Completed tailoring without human input")
-            
+        # Marks the thread as in use until its session key exists, so the
+        # checkpoint sweep doesn't take it for an expired one
+        running_key = self._running_key(session_id)
+        await get_redis().set(running_key, 1, ex=settings.session_ttl_seconds)
+        try:
+            # Run until human input is needed
+            result = await self.agent.run(initial_state, thread_id=session_id)
+
+            # Check if we need human input
+            if result.waiting_for_human:
+                logger.info(f"Waiting for human input: {result.human_question}")
+            else:
+                logger.info("Completed tailoring without human input")
+                await self.agent.delete_thread(session_id)
+                # Runs paused for review stay tied to their own checkpoint
+                # thread, so only completed ones are shared
+                await get_redis().set(
+                    result_key, result.model_dump_json(), ex=settings.session_ttl_seconds
+                )
+
+            await self.save_session_state(session_id, result)
+        finally:
+            await get_redis().delete(running_key)
+
         return result
 
-    async def provide_feedback(self, session_id: str, feedback: Dict) -> Dict:
+    async def provide_feedback(self, session_id: str, feedback: Dict) -> AgentState:
         """Process human feedback and continue the workflow"""
         logger.info("Processing human feedback")
         # Retrieve the current state for this session
-        current_state = self.get_session_state(session_id)
+        current_state = await self.get_session_state(session_id)
         
         if not current_state:
             logger.error(f"No state found for session {session_id}")
-            raise ValueError(f"Session {session_id} not found")
+            raise SessionNotFoundError(f"Session {session_id} not found")
+
+        # Finished sessions, and ones answered from the result cache, have no
+        # paused run to continue
+        if not await self.agent.is_waiting_for_feedback(session_id):
+            raise SessionNotWaitingError(
+                f"Session {session_id} is not waiting for feedback"
+            )
 
-        # Update state with feedback
-        current_state.human_feedback = feedback
-        current_state.waiting_for_human = False  # Reset the waiting flag
-        
         logger.info(f"Continuing workflow from step: {current_state.step_name}")
 
-        # Continue the workflow
-        result = await self.agent.run(current_state)
+        # Continue the workflow from its checkpoint with the feedback
+        result = await self.agent.resume(session_id, feedback)
         
         # Check if we need more human input
         if result.waiting_for_human:
             logger.info(f"Waiting for more human input: {result.human_question}")
         else:
             logger.info("Completed tailoring process")
+            await self.agent.delete_thread(session_id)
             
         return result
 
-    # In-memory storage for session states (for development/testing)
-    # In a production environment, this should be replaced with a database
-    _session_states = {}
+    async def prune_checkpoints(self):
+        """Delete checkpoint threads whose session has expired from Redis"""
+        redis = get_redis()
+        for thread_id in await self.agent.thread_ids():
+            if not await redis.exists(
+                self._session_key(thread_id), self._running_key(thread_id)
+            ):
+                await self.agent.delete_thread(thread_id)
+
+    async def aclose(self):
+        """Release the agent's checkpoint database connection"""
+        await self.agent.aclose()
+
+    @staticmethod
+    def _result_key(resume: str, job_description: str) -> str:
+        digest = hashlib.sha256(
+            f"{resume}\0{job_description}".encode()
+        ).hexdigest()
+        return f"result:{digest}"
+
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"sess:{session_id}"
+
+    @staticmethod
+    def _etag_key(session_id: str) -> str:
+        return f"sess:{session_id}:etag"
 
-    def get_session_state(self, session_id: str) -> Optional[AgentState]:
+    @staticmethod
+    def _running_key(session_id: str) -> str:
+        return f"sess:{session_id}:running"
+
+    async def get_session_state(self, session_id: str) -> Optional[AgentState]:
         """Retrieve the current state for a session"""
-        return self._session_states.get(session_id)
+        raw = await self.get_session_json(session_id)
+        if raw is None:
+            return None
+        return AgentState.model_validate_json(raw)
+
+    async def get_session_json(self, session_id: str) -> Optional[bytes]:
+        """Retrieve the stored JSON of a session's state without decoding it"""
+        return await get_redis().get(self._session_key(session_id))
+
+    async def get_session_json_and_etag(
+        self, session_id: str
+    ) -> Tuple[Optional[bytes], Optional[str]]:
+        """Retrieve a session's stored JSON together with its ETag"""
+        # One MGET, so the ETag always belongs to the body read with it
+        state_json, etag = await get_redis().mget(
+            self._session_key(session_id), self._etag_key(session_id)
+        )
+        return state_json, etag.decode() if etag is not None else None
 
     async def save_session_state(self, session_id: str, state: AgentState):
         """Save the current state for a session and send update via WebSocket"""
-        self._session_states[session_id] = state
+        # Serialized once, for both Redis and the WebSocket push
+        state_json = state.model_dump_json()
+
+        # Stored with its ETag so conditional GETs can be answered from the
+        # hash alone
+        etag = '"' + hashlib.blake2b(state_json.encode(), digest_size=8).hexdigest() + '"'
+
+        # Sessions live in Redis so every API worker sees them
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.set(
+                self._session_key(session_id), state_json, ex=settings.session_ttl_seconds
+            )
+            pipe.set(self._etag_key(session_id), etag, ex=settings.session_ttl_seconds)
+            await pipe.execute()
         
         # Send update via WebSocket if there's an active connection
         try:
             # Prepare the update data
             update_data = {
                 "type": "state_update",
-                "state": state.model_dump(),
                 "message": state.output if state.output else None,
                 "waiting_for_human": state.waiting_for_human,
                 "human_question": state.human_question if state.waiting_for_human else None,
-                "step_name": state.step_name
+                "step_name": state.step_name,
             }
+            if connection_manager.wants_msgpack(session_id):
+                update_data["state"] = state
+                update_data = ormsgpack.packb(
+                    update_data, option=ormsgpack.OPT_SERIALIZE_PYDANTIC
+                )
+            else:
+                # JSON clients get the state JSON already written to Redis
+                update_data["state"] = orjson.Fragment(state_json)
+                update_data = orjson.dumps(update_data).decode()
             
             # Send the update
             await connection_manager.send_update(session_id, update_data)
@@ -1,41 +1,151 @@
-from typing import Dict
+import asyncio
+from typing import Dict, Iterable, Optional, Set, Union
 
+import orjson
+import ormsgpack
 from fastapi import WebSocket
+
 from src.utils.logger_config import setup_logger
 
 logger = setup_logger(__name__)
 
+# Updates buffered per session before the oldest are dropped for a stuck client
+MAX_QUEUED_UPDATES = 64
+
 
 class ConnectionManager:
-    """Manages WebSocket connections for real-time updates"""
+    """Manages WebSocket connections for real-time updates
+
+    Updates are queued per session and written by a background task, so
+    callers never wait on a client's socket.
+    """
 
     def __init__(self):
         # Maps session_id to WebSocket connection
         self.active_connections: Dict[str, WebSocket] = {}
+        # Sessions whose client asked for msgpack (binary) frames instead of JSON
+        self.msgpack_sessions: Set[str] = set()
+        # Pending frames and the task draining them, per session
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.drain_tasks: Dict[str, asyncio.Task] = {}
+        # Set when the server side drops a session's connection
+        self.closed_events: Dict[str, asyncio.Event] = {}
 
-    async def connect(self, session_id: str, websocket: WebSocket):
-        """Accept a new WebSocket connection"""
+    async def connect(self, session_id: str, websocket: WebSocket, msgpack: bool = False):
+        """Accept a new WebSocket connection, optionally sending msgpack frames"""
         await websocket.accept()
+        # A reconnect replaces the previous connection and its queue
+        self.disconnect(session_id)
         self.active_connections[session_id] = websocket
+        if msgpack:
+            self.msgpack_sessions.add(session_id)
+        self.closed_events[session_id] = asyncio.Event()
+        self.queues[session_id] = asyncio.Queue(maxsize=MAX_QUEUED_UPDATES)
+        self.drain_tasks[session_id] = asyncio.create_task(self._drain(session_id))
         logger.info(f"WebSocket connected for session {session_id}")
 
-    def disconnect(self, session_id: str):
-        """Remove a WebSocket connection"""
+    def wants_msgpack(self, session_id: str) -> bool:
+        """Whether a session's client receives msgpack frames"""
+        return session_id in self.msgpack_sessions
+
+    def disconnect(self, session_id: str, websocket: Optional[WebSocket] = None):
+        """Remove a WebSocket connection
+
+        If websocket is given, the session is only removed while that socket
+        is still its connection, so a stale handler can't drop a reconnect.
+        """
+        if websocket is not None and self.active_connections.get(session_id) is not websocket:
+            return
+        closed = self.closed_events.pop(session_id, None)
+        if closed is not None:
+            closed.set()
+        self.queues.pop(session_id, None)
+        self.msgpack_sessions.discard(session_id)
+        task = self.drain_tasks.pop(session_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
         if session_id in self.active_connections:
             del self.active_connections[session_id]
             logger.info(f"WebSocket disconnected for session {session_id}")
 
-    async def send_update(self, session_id: str, data: dict):
-        """Send an update to a specific session"""
-        if session_id in self.active_connections:
+    async def wait_closed(self, session_id: str, websocket: WebSocket):
+        """Wait until the client disconnects or the connection is dropped here"""
+        closed = self.closed_events[session_id]
+
+        async def _receive_until_disconnect():
+            # Raw receive: client frames are ignored without decoding them
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+        tasks = {
+            asyncio.create_task(_receive_until_disconnect()),
+            asyncio.create_task(closed.wait()),
+        }
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _drain(self, session_id: str):
+        """Write queued updates to a session's socket in order"""
+        websocket = self.active_connections[session_id]
+        queue = self.queues[session_id]
+        while True:
+            payload = await queue.get()
             try:
-                await self.active_connections[session_id].send_json(data)
+                if isinstance(payload, bytes):
+                    await websocket.send_bytes(payload)
+                else:
+                    await websocket.send_text(payload)
                 logger.info(f"Sent update to session {session_id}")
             except Exception as e:
                 logger.error(f"Error sending update to session {session_id}: {str(e)}")
-                self.disconnect(session_id)
-        else:
+                self.disconnect(session_id, websocket)
+                return
+
+    async def send_update(self, session_id: str, data: Union[dict, str, bytes]):
+        """Queue an update for a specific session"""
+        if session_id not in self.active_connections:
             logger.warning(f"No active connection for session {session_id}")
+            return
+        await self.broadcast([session_id], data)
+
+    async def broadcast(self, session_ids: Iterable[str], data: Union[dict, str, bytes]):
+        """Queue the same update for several sessions
+
+        Dicts are serialized here, at most once per format: JSON text frames
+        by default, msgpack binary frames for sessions that asked for them.
+        Pre-serialized payloads are sent as-is, str in a text frame and bytes
+        in a binary frame.
+        """
+        queues = [
+            (session_id, self.queues[session_id])
+            for session_id in session_ids
+            if session_id in self.queues
+        ]
+        if not queues:
+            return
+
+        encoded = {}
+        for session_id, queue in queues:
+            payload = data
+            if isinstance(data, dict):
+                binary = session_id in self.msgpack_sessions
+                if binary not in encoded:
+                    encoded[binary] = (
+                        ormsgpack.packb(data, option=ormsgpack.OPT_SERIALIZE_PYDANTIC)
+                        if binary
+                        else orjson.dumps(data).decode()
+                    )
+                payload = encoded[binary]
+
+            if queue.full():
+                # Drop the oldest update rather than let a stuck client grow
+                # the queue without bound
+                queue.get_nowait()
+                logger.warning(f"Dropped a queued update for session {session_id}")
+            queue.put_nowait(payload)
 
 
 # Create a singleton instance
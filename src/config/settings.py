@@ -14,18 +14,50 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = Field(
         validation_alias="OPENAI_API_KEY", default=None
     )
+    redis_url: str = Field(
+        validation_alias="REDIS_URL", default="redis://localhost:6379/0"
+    )
     PROJECT_NAME: str = "Resume Tailoring"
 
+    # Logging (LOG_LEVEL / LOG_DIAGNOSE); diagnose adds local variables to
+    # tracebacks, which is costly, so it's off unless debugging
+    log_level: str = "INFO"
+    log_diagnose: bool = False
+
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     api_workers: int = 1
     api_reload: bool = True
+    # Threads for blocking work (PDF parsing, scraping) run off the event loop
+    blocking_workers: int = 4
 
     # Model Configuration
     model_name: str = "gpt-4-turbo-preview"
     temperature: float = 0.7
     max_tokens: int = 4000
+    max_concurrent_llm_calls: int = 8
+    # Requirements checked per analyze_resume call; batches run concurrently
+    requirements_per_batch: int = 8
+    # Retries (with exponential backoff) for rate-limited or failed LLM calls
+    llm_max_retries: int = 5
+    # Repeated identical prompts (e.g. the same job description analysed for
+    # several resumes) are answered from an in-memory cache. Each worker
+    # process keeps its own.
+    llm_cache_size: int = 512
+    # OpenAI processing tier, e.g. "priority" for latency-optimized inference
+    openai_service_tier: Optional[str] = None
+    # Resumes that mention at least this percentage of the job's required
+    # skills skip polishing when no changes were approved
+    skill_coverage_target: float = 90.0
+    # SQLite file holding workflow checkpoints, keyed by session id
+    checkpoint_db_path: str = "agent_state.db"
+    # Seconds an idle tailoring session is kept in Redis
+    session_ttl_seconds: int = 3600
+    # Seconds a scraped job description is reused for the same URL
+    job_description_ttl_seconds: int = 86400
+    # Seconds the text parsed from an uploaded PDF is reused for identical bytes
+    resume_text_ttl_seconds: int = 86400
     backend_cors_origins: list = ["http://localhost:3000"]
 
     model_config = SettingsConfigDict(
@@ -0,0 +1,67 @@
+import re
+from collections import Counter
+from typing import Iterable
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+# Common words that carry no signal for keyword matching
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from has have in is it its of on or our that
+    the their this to we will with you your who what which all any can may
+    must should would about into over more other such than then they them
+    """.split()
+)
+
+
+def _keywords(text: str) -> Counter:
+    return Counter(
+        word
+        for word in _WORD_RE.findall(text.lower())
+        if len(word) > 1 and word not in _STOPWORDS
+    )
+
+
+def ats_score(resume: str, job_description: str) -> float:
+    """
+    Estimate ATS compatibility as keyword coverage of the job description.
+
+    Args:
+        resume: The resume text to score
+        job_description: The job description the resume is matched against
+
+    Returns:
+        float: Score between 0 and 100
+    """
+    jd_keywords = _keywords(job_description)
+    total = sum(jd_keywords.values())
+    if not total:
+        return 0.0
+
+    resume_keywords = _keywords(resume)
+    covered = sum(min(resume_keywords[word], count) for word, count in jd_keywords.items())
+    return round(100 * covered / total, 1)
+
+
+def skill_coverage(resume: str, skills: Iterable[str]) -> float:
+    """
+    Estimate how many of a job's required skills a resume mentions.
+
+    A skill counts as covered when every keyword in its name appears in the
+    resume, so the score isn't diluted by the job description's filler words.
+
+    Args:
+        resume: The resume text to score
+        skills: Names of the required skills
+
+    Returns:
+        float: Percentage of skills covered, between 0 and 100
+    """
+    skill_keywords = [set(_keywords(skill)) for skill in skills]
+    skill_keywords = [keywords for keywords in skill_keywords if keywords]
+    if not skill_keywords:
+        return 0.0
+
+    resume_keywords = _keywords(resume)
+    covered = sum(1 for keywords in skill_keywords if keywords <= resume_keywords.keys())
+    return round(100 * covered / len(skill_keywords), 1)
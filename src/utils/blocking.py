@@ -0,0 +1,28 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Callable, TypeVar
+
+from src.config.settings import settings
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=1)
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool for blocking helpers, creating it on first use
+
+    Kept apart from the loop's default executor, which LangGraph and LangChain
+    use for sync nodes and callbacks, so a burst of uploads can't starve them.
+    """
+    return ThreadPoolExecutor(
+        max_workers=settings.blocking_workers, thread_name_prefix="blocking"
+    )
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking call on the bounded blocking pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_blocking_executor(), partial(func, *args, **kwargs)
+    )
@@ -1,10 +1,14 @@
+import hashlib
 import re
 from typing import Optional
 
-from langchain_community.document_loaders import FireCrawlLoader
 from langchain_core.documents import Document
 
 from src.config.settings import settings
+from src.utils.blocking import run_blocking
+from src.utils.redis_client import get_redis
+
+_WHITESPACE_RE = re.compile(r"\s+")
 
 
 async def scrape_job_details(url: str, api_key: Optional[str] = None) -> str:
@@ -18,6 +22,10 @@ async def scrape_job_details(url: str, api_key: Optional[str] = None) -> str:
     Returns:
         str: Extracted job description
     """
+    # langchain_community pulls in a large import tree; load it on first
+    # scrape instead of at app startup
+    from langchain_community.document_loaders import FireCrawlLoader
+
     try:
         # Initialize FireCrawlLoader
         loader = FireCrawlLoader(
@@ -26,8 +34,8 @@ async def scrape_job_details(url: str, api_key: Optional[str] = None) -> str:
             api_key=api_key or settings.firecrawl_api_key,
         )
 
-        # Load the document
-        docs = loader.load()
+        # Load the document; the loader's HTTP call is blocking
+        docs = await run_blocking(loader.load)
 
         if not docs:
             raise Exception("No content found at the URL")
@@ -38,12 +46,31 @@ async def scrape_job_details(url: str, api_key: Optional[str] = None) -> str:
         # Extract the content
         content = doc.page_content
 
-        # Basic cleaning
-        content = re.sub(r"\s+", " ", content)  # Remove multiple spaces
-        content = re.sub(r"\n\s*\n", "\n\n", content)  # Remove multiple newlines
-        content = content.strip()
+        # Basic cleaning: collapse all runs of whitespace, newlines included
+        content = _WHITESPACE_RE.sub(" ", content).strip()
 
         return content
 
     except Exception as e:
         raise Exception(f"Error scraping job details: {str(e)}")
+
+
+async def scrape_job_details_cached(url: str, api_key: Optional[str] = None) -> str:
+    """
+    Scrape job details, reusing a recent result for the same URL from Redis.
+
+    Args:
+        url: The job posting URL
+        api_key: Optional FireCrawl API key. If not provided, will use the one from settings.
+
+    Returns:
+        str: Extracted job description
+    """
+    key = f"jd:{hashlib.sha256(url.encode()).hexdigest()}"
+    cached = await get_redis().get(key)
+    if cached is not None:
+        return cached.decode()
+
+    content = await scrape_job_details(url, api_key)
+    await get_redis().set(key, content, ex=settings.job_description_ttl_seconds)
+    return content
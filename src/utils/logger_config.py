@@ -4,6 +4,11 @@ from typing import Optional
 
 from loguru import logger
 
+from src.config.settings import settings
+
+# The console sink is shared by every module, so it's added only once
+_console_configured = False
+
 
 def setup_logger(module_name: str, logs_dir: Optional[str] = None):  # type: ignore[no-untyped-def]
     """
@@ -18,20 +23,20 @@ def setup_logger(module_name: str, logs_dir: Optional[str] = None):  # type: ign
     logs_dir = logs_dir or os.path.join(os.getcwd(), "logs")
     os.makedirs(logs_dir, exist_ok=True)
 
-    configured_logger = logger.bind(name=module_name)
-
-    # remove the default handler
-    configured_logger.remove()
+    global _console_configured
+    if not _console_configured:
+        # remove the default handler
+        logger.remove()
 
-    # add console handler
-    configured_logger.add(
-        sys.stdout,
-        format="""Service:SharePointSync | <green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>
+        # add console handler
+        logger.add(
+            sys.stdout,
+            format="""Service:SharePointSync | <green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>
 {exception}""",
-        level="DEBUG",
-        enqueue=True,
-        diagnose=True,  # Show variables in the stack trace
-        backtrace=True,  # Show full traceback
-    )
+            level=settings.log_level.upper(),
+            diagnose=settings.log_diagnose,  # Show variables in the stack trace
+            backtrace=settings.log_diagnose,  # Show full traceback
+        )
+        _console_configured = True
 
-    return configured_logger
+    return logger.bind(name=module_name)
@@ -1,52 +1,221 @@
+import asyncio
+import hashlib
+import multiprocessing
 import os
-import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO, List, Optional, Union
 
-from fastapi import UploadFile
-from langchain_community.document_loaders import PyPDFLoader
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+from fastapi import HTTPException, UploadFile
 
+from src.config.settings import settings
+from src.utils.blocking import run_blocking
+from src.utils.redis_client import get_redis
 
-async def parse_resume_pdf(file: UploadFile) -> str:
+# Largest accepted upload; resumes are a few MB at most
+MAX_PDF_BYTES = 10 * 1024 * 1024
+
+# PDFs with at least this many pages are split across worker processes; below
+# it, the pickling and IPC cost more than the extraction itself
+PARALLEL_PAGE_THRESHOLD = 4
+
+# PDFium is not thread-safe, so in-process calls from worker threads are
+# serialized. Worker processes each have their own PDFium instance.
+_PDFIUM_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _process_workers() -> int:
+    # process_cpu_count (3.13+) honours the CPU affinity mask; neither it nor
+    # cpu_count sees cgroup CPU quotas
+    count_cpus = getattr(os, "process_cpu_count", os.cpu_count)
+    return count_cpus() or 1
+
+
+@lru_cache(maxsize=1)
+def _process_pool() -> ProcessPoolExecutor:
+    # The server process runs threads (the blocking pool, HTTP clients), and
+    # forking it could copy a lock held by one of them into the worker
+    return ProcessPoolExecutor(
+        max_workers=_process_workers(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+# PDFium reads either in-memory bytes or a seekable binary file
+PdfSource = Union[bytes, BinaryIO]
+
+
+def _digest(source: PdfSource) -> str:
+    """Hash a PDF's bytes for the parsed-text cache key"""
+    if isinstance(source, bytes):
+        return hashlib.blake2b(source, digest_size=16).hexdigest()
+    source.seek(0)
+    digest = hashlib.file_digest(source, lambda: hashlib.blake2b(digest_size=16))
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def _page_count(content: PdfSource) -> int:
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(content)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+def _extract_pages(
+    content: PdfSource, start: int = 0, stop: Optional[int] = None
+) -> List[str]:
+    """Extract the text of pages [start, stop) of a PDF with PDFium"""
+    pdf = pdfium.PdfDocument(content)
+    try:
+        stop = len(pdf) if stop is None else stop
+        return [_page_text(pdf[i]) for i in range(start, stop)]
+    finally:
+        pdf.close()
+
+
+def _page_text(page: pdfium.PdfPage) -> str:
+    # Pages and text pages hold native PDFium memory; release them as soon as
+    # the text is copied out rather than whenever they're garbage collected
+    try:
+        # Blank pages have no page objects; skip building a text page for them
+        if not pdfium_c.FPDFPage_CountObjects(page.raw):
+            return ""
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_bounded()
+        finally:
+            textpage.close()
+    finally:
+        page.close()
+
+
+def _extract_pages_locked(content: PdfSource) -> List[str]:
+    with _PDFIUM_LOCK:
+        return _extract_pages(content)
+
+
+async def _extract_pages_in_parallel(content: bytes, page_count: int) -> List[str]:
+    """Extract contiguous page ranges on the process pool, one range per worker"""
+    chunk_size = -(-page_count // _process_workers())
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                _process_pool(), _extract_pages, content, start, min(start + chunk_size, page_count)
+            )
+            for start in range(0, page_count, chunk_size)
+        )
+    )
+    return [text for chunk in chunks for text in chunk]
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Resume PDF exceeds the {MAX_PDF_BYTES // (1024 * 1024)} MB limit",
+    )
+
+
+async def _read_bounded(file: UploadFile) -> bytes:
+    """Read an upload in chunks, stopping as soon as it passes MAX_PDF_BYTES"""
+    buffer = bytearray()
+    while chunk := await file.read(1 << 20):
+        buffer.extend(chunk)
+        if len(buffer) > MAX_PDF_BYTES:
+            raise _too_large()
+    return bytes(buffer)
+
+
+async def _read_all(content: PdfSource) -> bytes:
+    """Return a PDF's bytes, reading them from its file if need be"""
+    if isinstance(content, bytes):
+        return content
+    content.seek(0)
+    return await run_blocking(content.read)
+
+
+async def parse_resume_pdf(file: UploadFile, in_batch: bool = False) -> str:
     """
-    Parse a PDF file and extract its text content using langchain's PyPDFLoader.
+    Parse a PDF file and extract its text content using PDFium.
 
     Args:
         file: FastAPI UploadFile object containing the PDF
+        in_batch: Whether other PDFs are being parsed alongside this one
 
     Returns:
         str: Extracted text from the PDF
     """
     try:
-        # Create a temporary file to store the uploaded PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
+        # Reject oversized uploads before reading them at all. An UploadFile
+        # not built by the form parser may have no size; measure its file then.
+        size = file.size
+        if size is None:
+            size = file.file.seek(0, os.SEEK_END)
+            file.file.seek(0)
+        if size > MAX_PDF_BYTES:
+            raise _too_large()
 
-        # Use PyPDFLoader to load the PDF
-        loader = PyPDFLoader(temp_path)
-        pages = []
+        # Uploads too large for memory have already been spooled to disk by
+        # Starlette; hash and read those from the file instead of copying them
+        # into a bytes object. Small ones are in memory either way.
+        if getattr(file.file, "_rolled", False):
+            content = file.file
+        else:
+            content = await _read_bounded(file)
 
-        # Load pages asynchronously
-        async for page in loader.alazy_load():
-            pages.append(page)
+        # Re-uploads of the same file reuse the text parsed the first time
+        key = f"pdf:{await run_blocking(_digest, content)}"
+        cached = await get_redis().get(key)
+        if cached is not None:
+            return cached.decode()
 
-        # Extract and combine text from all pages
-        text_content = []
-        for page in pages:
-            text_content.append(page.page_content)
+        # PDFium runs native code without yielding, so keep it off the event loop
+        page_count = await run_blocking(_page_count, content)
+        if page_count >= PARALLEL_PAGE_THRESHOLD:
+            # Worker processes need the bytes themselves
+            content = await _read_all(content)
+            text_content = await _extract_pages_in_parallel(content, page_count)
+        elif in_batch:
+            # Short PDFs parsed together would queue on _PDFIUM_LOCK here, so
+            # each goes to a worker process whole
+            content = await _read_all(content)
+            text_content = await asyncio.get_running_loop().run_in_executor(
+                _process_pool(), _extract_pages, content
+            )
+        else:
+            text_content = await run_blocking(_extract_pages_locked, content)
 
         # Join all pages
-        full_text = "\n\n".join(text_content)
-
-        return full_text.strip()
+        text = "\n\n".join(text_content).strip()
+        await get_redis().set(key, text, ex=settings.resume_text_ttl_seconds)
+        return text
 
-    except Exception as e:
-        raise Exception(f"Error parsing PDF: {str(e)}")
+    except pdfium.PdfiumError as e:
+        # A malformed or encrypted upload is the client's error; anything else
+        # propagates unchanged with its traceback
+        raise HTTPException(status_code=400, detail=f"Invalid PDF: {e}") from e
     finally:
-        # Clean up the temporary file
         await file.close()
-        if "temp_path" in locals():
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+
+
+async def parse_resume_pdfs(files: List[UploadFile]) -> List[str]:
+    """
+    Parse several PDF files in parallel across worker processes.
+
+    Args:
+        files: FastAPI UploadFile objects containing the PDFs
+
+    Returns:
+        List[str]: Extracted text of each PDF, in the order given
+    """
+    in_batch = len(files) > 1
+    return list(
+        await asyncio.gather(*(parse_resume_pdf(file, in_batch) for file in files))
+    )
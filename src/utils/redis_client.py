@@ -0,0 +1,11 @@
+from functools import lru_cache
+
+from redis.asyncio import Redis
+
+from src.config.settings import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> Redis:
+    """Return the process-wide Redis client, creating it on first use"""
+    return Redis.from_url(settings.redis_url)
@@ -0,0 +1,42 @@
+import re
+from typing import Dict
+
+_HEADING_RE = re.compile(r"^##\s+(.+?)\s*$", re.MULTILINE)
+
+# Text extracted from a PDF has no markup, so headings are recognised as
+# lines holding only a common section name, in any case, with an optional
+# trailing colon
+_PLAIN_HEADINGS = (
+    "summary|professional summary|profile|professional profile|objective|about|about me"
+    "|skills|technical skills|core competencies|key skills"
+    "|experience|work experience|professional experience|employment history|employment"
+    "|projects|key projects|education|certifications|certificates|awards"
+    "|publications|volunteer experience|volunteering|languages|interests"
+)
+_PLAIN_HEADING_RE = re.compile(
+    rf"^[ \t]*({_PLAIN_HEADINGS})[ \t]*:?[ \t]*\r?$", re.MULTILINE | re.IGNORECASE
+)
+
+
+def split_sections(resume: str) -> Dict[str, str]:
+    """
+    Split a resume into its sections.
+
+    Markdown `## ` headings are used when present; otherwise lines naming a
+    common resume section (as in text extracted from a PDF) are.
+
+    Args:
+        resume: The resume text to split
+
+    Returns:
+        Dict[str, str]: Section body keyed by lower-cased heading. Empty if no
+        headings are found.
+    """
+    headings = list(_HEADING_RE.finditer(resume)) or list(
+        _PLAIN_HEADING_RE.finditer(resume)
+    )
+    sections = {}
+    for heading, following in zip(headings, headings[1:] + [None]):
+        end = following.start() if following else len(resume)
+        sections[heading.group(1).lower()] = resume[heading.end() : end].strip()
+    return sections